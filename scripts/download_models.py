@@ -1,22 +1,46 @@
 """
 download_models.py
 Discord-Live-Scribe で必要な STT / VAD モデルをローカルにキャッシュするスクリプト
-Python ≥3.9 / pip install huggingface_hub torch を前提
+Python ≥3.9 / pip install -r requirements.txt を前提
+（requirements.txt に含まれる hf_transfer で並列の高速ダウンロードを有効化する）
 """
 
 import argparse
+import importlib.util
+import os
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# huggingface_hub は import 時に環境変数を読むため、import より前に設定する
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
+KOTOBA_REPO_ID = "kotoba-tech/kotoba-whisper-v2.0-faster"
+KOTOBA_PATTERNS = [
+    "*.bin",
+    "*.json",
+    "*.model",
+    "*.txt",
+    "tokenizer*",
+    "*.safetensors",
+]
+# 途中で中断された model.bin を完了済みと誤認しないための下限サイズ
+KOTOBA_MIN_MODEL_BYTES = 100 * 1024 * 1024
+
 
 # ------------------------------------------------------------
 # region Kotoba-Whisper v2.0 (CTranslate2)
-def fetch_kotoba(dest: Path) -> None:
+def fetch_kotoba(dest: Path, force: bool = False) -> None:
     """Kotoba-Whisper v2.0 モデルをダウンロードして保存する。
 
+    ``dest`` を Hugging Face のキャッシュディレクトリとして使用するため、
+    faster-whisper の ``download_root`` にそのまま指定できる。
+
     Args:
         dest (Path): モデルを保存するディレクトリのパス。
+        force (bool): ``True`` の場合はキャッシュ済みでも再取得する。
 
     Returns:
         None: 戻り値はありません。
@@ -25,26 +49,37 @@ def fetch_kotoba(dest: Path) -> None:
         huggingface_hub.utils.HFValidationError: ダウンロードに失敗した場合。
         requests.exceptions.RequestException: ネットワーク障害が発生した場合。
     """
-    from huggingface_hub import snapshot_download
-
-    repo_id = "kotoba-tech/kotoba-whisper-v2.0-faster"
-    print(f"▶ Downloading {repo_id} …")
-    snapshot_download(
-        repo_id,
-        local_dir=dest / "kotoba-whisper-v2.0-faster",
-        local_dir_use_symlinks=False,
-        resume_download=True,
+    from huggingface_hub import snapshot_download, try_to_load_from_cache
+
+    cached = try_to_load_from_cache(KOTOBA_REPO_ID, "model.bin", cache_dir=dest)
+    if (
+        not force
+        and isinstance(cached, str)
+        and Path(cached).stat().st_size > KOTOBA_MIN_MODEL_BYTES
+    ):
+        print(f"  ✓ {KOTOBA_REPO_ID} はキャッシュ済みのためスキップします")
+        return
+
+    print(f"▶ Downloading {KOTOBA_REPO_ID} …")
+    snapshot_dir = snapshot_download(
+        KOTOBA_REPO_ID,
+        cache_dir=dest,
+        max_workers=8,
+        allow_patterns=KOTOBA_PATTERNS,
+        force_download=force,
     )
+    print(f"  ✓ {KOTOBA_REPO_ID} → {snapshot_dir}")
 
 
 # endregion
 # ------------------------------------------------------------
 # region Silero-VAD v5 (.jit)
-def fetch_silero(dest: Path) -> None:
+def fetch_silero(dest: Path, force: bool = False) -> None:
     """Silero-VAD v5 の jit モデルをダウンロードして保存する。
 
     Args:
         dest (Path): モデルを保存するディレクトリのパス。
+        force (bool): ``True`` の場合は保存済みでも再取得する。
 
     Returns:
         None: 戻り値はありません。
@@ -53,6 +88,10 @@ def fetch_silero(dest: Path) -> None:
         SystemExit: ``silero_vad.jit`` が見つからない場合。
         RuntimeError: ``torch.hub.load`` に失敗した場合。
     """
+    if not force and (dest / "silero_vad.jit").is_file():
+        print("  ✓ silero_vad.jit は保存済みのためスキップします")
+        return
+
     import torch
 
     print("▶ Downloading Silero-VAD (jit) …")
@@ -60,10 +99,16 @@ def fetch_silero(dest: Path) -> None:
         repo_or_dir="snakers4/silero-vad",
         model="silero_vad",
         trust_repo=True,
-        force_reload=False,
+        force_reload=force,
     )
-    hub_dir = Path(torch.hub.get_dir())
-    jit_file = next(hub_dir.rglob("silero_vad.jit"), None)
+    repo_dir = Path(torch.hub.get_dir()) / "snakers4_silero-vad_master"
+    candidates = (
+        repo_dir / "src" / "silero_vad" / "data" / "silero_vad.jit",  # v5
+        repo_dir / "files" / "silero_vad.jit",  # v4 以前
+    )
+    jit_file = next((p for p in candidates if p.is_file()), None)
+    if jit_file is None:
+        jit_file = next(repo_dir.rglob("silero_vad.jit"), None)
     if jit_file is None:
         sys.exit("❌ silero_vad.jit が見つかりませんでした")
     shutil.copy2(jit_file, dest / "silero_vad.jit")
@@ -98,11 +143,22 @@ def main() -> None:
         default=default_dir,
         help=f"保存先ディレクトリ（デフォルト: {default_dir}）",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="保存済みのモデルがあっても再ダウンロードする",
+    )
     args = parser.parse_args()
     args.output.mkdir(parents=True, exist_ok=True)
 
-    fetch_kotoba(args.output)
-    fetch_silero(args.output)
+    # 保存先が重ならないため、ネットワーク待ちを重ねるよう並行して取得する
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(fetch_kotoba, args.output, args.force),
+            executor.submit(fetch_silero, args.output, args.force),
+        ]
+        for future in futures:
+            future.result()
 
     print(f"\n✅ All models saved under: {args.output.resolve()}")
 
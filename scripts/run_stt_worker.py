@@ -0,0 +1,68 @@
+"""
+run_stt_worker.py
+Redis Streams の音声を文字起こしする STT ワーカーを、ボットとは別プロセスで起動するスクリプト
+リポジトリ直下で ``python -m scripts.run_stt_worker`` として実行する
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from src.main import (
+    AUDIO_STREAM,
+    RedisAudioStream,
+    STTWorker,
+    connect_redis,
+    setup_logging,
+)
+
+
+async def run() -> None:
+    """Redis へ接続し、STT ワーカーを停止されるまで動かし続ける。
+
+    Args:
+        なし
+
+    Returns:
+        None: 戻り値はありません。
+
+    Raises:
+        RuntimeError: Redis 接続または STT モデルの読み込みに問題がある場合。
+    """
+    load_dotenv()
+    listener = setup_logging()
+    try:
+        redis_client = await connect_redis()
+        audio_stream = RedisAudioStream(redis_client, AUDIO_STREAM)
+        worker = STTWorker(
+            audio_stream,
+            os.getenv("MODEL_DIR", "./models"),
+            max_workers=int(os.getenv("STT_WORKERS", "1")),
+            allow_dummy=os.getenv("STT_ALLOW_DUMMY") == "1",
+        )
+        try:
+            await worker.run()
+        finally:
+            worker.close()
+    finally:
+        listener.stop()
+
+
+def main() -> None:
+    """STT ワーカーのイベントループを開始する。
+
+    Args:
+        なし
+
+    Returns:
+        None: 戻り値はありません。
+
+    Raises:
+        RuntimeError: Redis 接続に問題がある場合。
+    """
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Redis Streams へ書き込む前後の音声信号処理をまとめたモジュール。
+
+本モジュールは以下の責務を持つ。
+
+* 48 kHz ステレオの PCM を Whisper の入力形式である 16 kHz モノラルへ変換する。
+* 16bit PCM と ITU-T G.711 µ-law を相互に変換する。
+
+numba が利用できる場合はフレームごとのループを JIT コンパイルして 1 パスで処理し、
+利用できない場合は numpy のベクトル演算で同じ結果を返す。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Union
+
+import numpy as np
+
+PCMBuffer = Union[bytes, bytearray, memoryview]
+"""PCM 音声データとして受け付けるバッファ型。"""
+
+njit: Callable[..., Any] | None
+try:
+    from numba import njit
+except Exception:  # pragma: no cover - 環境依存のためテスト除外
+    njit = None
+
+
+def _build_mulaw_tables() -> tuple[np.ndarray, np.ndarray]:
+    """µ-law の符号化・復号用ルックアップテーブルを生成する。
+
+    Returns:
+        16bit 値（``uint16`` として解釈）から µ-law への変換表と、
+        µ-law から 16bit PCM への変換表の組。
+    """
+
+    linear = np.arange(-32768, 32768, dtype=np.int32)
+    sign = np.where(linear < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(linear), 32635) + 0x84
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    encode = np.empty(65536, dtype=np.uint8)
+    encode[linear.astype(np.uint16)] = ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+    ulaw = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (ulaw >> 4) & 0x07
+    magnitude = ((((ulaw & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    decode = np.where(ulaw & 0x80, -magnitude, magnitude).astype("<i2")
+    return encode, decode
+
+
+_MULAW_ENCODE, _MULAW_DECODE = _build_mulaw_tables()
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _downsample_kernel(samples: np.ndarray) -> np.ndarray:
+        """インターリーブされたステレオ 3 フレームごとの平均を求める。"""
+
+        out = np.empty(len(samples) // 6, dtype=np.int16)
+        for i in range(len(out)):
+            acc = 0
+            for j in range(6):
+                acc += samples[i * 6 + j]
+            out[i] = int(acc / 6)
+        return out
+
+    @njit(cache=True)
+    def _mulaw_resample_kernel(samples: np.ndarray, table: np.ndarray) -> np.ndarray:
+        """ダウンサンプリングと µ-law 符号化を 1 パスで行う。"""
+
+        out = np.empty(len(samples) // 6, dtype=np.uint8)
+        for i in range(len(out)):
+            acc = 0
+            for j in range(6):
+                acc += samples[i * 6 + j]
+            out[i] = table[int(acc / 6) & 0xFFFF]
+        return out
+
+    # Discord のコールバック内で JIT コンパイルが走らないよう、np.frombuffer が
+    # 返しうる読み取り専用（bytes 由来）と書き込み可能（bytearray 由来）の
+    # 両方の配列型で import 時にコンパイルしておく
+    for _warmup in (
+        np.frombuffer(bytes(12), dtype="<i2"),
+        np.frombuffer(bytearray(12), dtype="<i2"),
+    ):
+        _downsample_kernel(_warmup)
+        _mulaw_resample_kernel(_warmup, _MULAW_ENCODE)
+    del _warmup
+
+    def downsample_to_16k_mono(pcm: PCMBuffer) -> np.ndarray:
+        """48 kHz ステレオの PCM を 16 kHz モノラルへ変換する。
+
+        3 フレーム分の両チャンネルを平均して間引く。Discord のフレームは
+        960 サンプル単位で 3 の倍数のため、チャンク間で状態を持ち越す必要はない。
+
+        Args:
+            pcm: 48 kHz ステレオの 16bit PCM 音声データ。
+
+        Returns:
+            16 kHz モノラルの 16bit PCM サンプル列。
+        """
+
+        return _downsample_kernel(np.frombuffer(pcm, dtype="<i2"))
+
+    def mulaw_resample_mono(pcm: PCMBuffer) -> bytes:
+        """48 kHz ステレオの PCM を 16 kHz モノラルの µ-law へ変換する。
+
+        Args:
+            pcm: 48 kHz ステレオの 16bit PCM 音声データ。
+
+        Returns:
+            1 サンプル 1 バイトの µ-law データ。
+        """
+
+        samples = np.frombuffer(pcm, dtype="<i2")
+        return _mulaw_resample_kernel(samples, _MULAW_ENCODE).tobytes()
+
+else:
+
+    def downsample_to_16k_mono(pcm: PCMBuffer) -> np.ndarray:
+        """48 kHz ステレオの PCM を 16 kHz モノラルへ変換する。
+
+        3 フレーム分の両チャンネルを平均して間引く。Discord のフレームは
+        960 サンプル単位で 3 の倍数のため、チャンク間で状態を持ち越す必要はない。
+
+        Args:
+            pcm: 48 kHz ステレオの 16bit PCM 音声データ。
+
+        Returns:
+            16 kHz モノラルの 16bit PCM サンプル列。
+        """
+
+        samples = np.frombuffer(pcm, dtype="<i2")
+        samples = samples[: len(samples) // 6 * 6].reshape(-1, 6)
+        return samples.mean(axis=1).astype("<i2")
+
+    def mulaw_resample_mono(pcm: PCMBuffer) -> bytes:
+        """48 kHz ステレオの PCM を 16 kHz モノラルの µ-law へ変換する。
+
+        Args:
+            pcm: 48 kHz ステレオの 16bit PCM 音声データ。
+
+        Returns:
+            1 サンプル 1 バイトの µ-law データ。
+        """
+
+        return encode_mulaw(downsample_to_16k_mono(pcm))
+
+
+def encode_mulaw(pcm: PCMBuffer | np.ndarray) -> bytes:
+    """16bit PCM を µ-law へ符号化する。
+
+    Args:
+        pcm: 16bit リトルエンディアンの PCM 音声データ。
+
+    Returns:
+        1 サンプル 1 バイトの µ-law データ。
+    """
+
+    return _MULAW_ENCODE[np.frombuffer(pcm, dtype="<u2")].tobytes()
+
+
+def decode_mulaw(payload: bytes) -> np.ndarray:
+    """µ-law を 16bit PCM へ復号する。
+
+    Args:
+        payload: :func:`encode_mulaw` で符号化したデータ。
+
+    Returns:
+        16bit PCM サンプル列。
+    """
+
+    return _MULAW_DECODE[np.frombuffer(payload, dtype=np.uint8)]
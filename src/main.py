@@ -4,23 +4,44 @@
 
 * `.env` ファイルから環境変数を読み込む。
 * Discord ボットを起動する。
-* 受信した音声を PCM へ変換して Redis Streams に書き込む。
-* Redis Streams を監視する STT ワーカーを起動し、音声を文字起こしする。
+* 受信した音声を PCM へ変換し、必要に応じて Opus や µ-law で圧縮して Redis Streams に書き込む。
+* Redis Streams を監視して音声を文字起こしする STT ワーカーを提供する
+  （起動は ``scripts/run_stt_worker.py`` から行う）。
 """
 
 from __future__ import annotations
 
 import asyncio
 import importlib
+import logging
+import logging.handlers
+import multiprocessing
 import os
+import queue
+import socket
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from types import ModuleType
 from typing import Any, Dict, Optional
 
 import discord
+import numpy as np
 import redis.asyncio as redis
 from discord.ext import commands
 from dotenv import load_dotenv
-from redis.exceptions import ConnectionError
+from redis.exceptions import ConnectionError, RedisError, ResponseError
+from redis.utils import HIREDIS_AVAILABLE
+
+from src.audio_dsp import (
+    PCMBuffer,
+    decode_mulaw,
+    downsample_to_16k_mono,
+    mulaw_resample_mono,
+)
+
+logger = logging.getLogger(__name__)
 
 sinks_module: ModuleType | None
 try:
@@ -49,67 +70,411 @@ else:
     RawDataSink = _RawDataSink
 
 
+AUDIO_STREAM = "audio"
+"""音声チャンクを流す Redis Streams のキー名。"""
+
+STT_GROUP = "stt"
+"""STT ワーカーが参加するコンシューマーグループ名。"""
+
+CODEC_PCM = b"pcm"
+"""16 kHz モノラルの 16bit PCM をそのまま格納するコーデック名。"""
+
+CODEC_OPUS = b"opus"
+"""20 ms ごとの Opus パケットを 2 バイト長の接頭辞付きで連結するコーデック名。"""
+
+CODEC_MULAW = b"mulaw"
+"""16 kHz モノラルの PCM を ITU-T G.711 µ-law で 8bit に量子化したコーデック名。"""
+
+_OPUS_LENGTH = struct.Struct(">H")
+
+
+def _encode_opus(encoder: discord.opus.Encoder, pcm: PCMBuffer) -> bytes:
+    """PCM を 20 ms ごとの Opus パケット列へ符号化する。
+
+    Args:
+        encoder: チャンクごとに生成した Opus エンコーダー。
+        pcm: 48 kHz ステレオの 16bit PCM 音声データ。末尾の端数は無音で補う。
+
+    Returns:
+        長さ接頭辞付きで連結した Opus パケット列。
+    """
+
+    frame_size = discord.opus.Encoder.FRAME_SIZE
+    data = bytes(pcm)
+    remainder = len(data) % frame_size
+    if remainder:
+        data += bytes(frame_size - remainder)
+    out = bytearray()
+    for offset in range(0, len(data), frame_size):
+        packet = encoder.encode(
+            data[offset : offset + frame_size],
+            discord.opus.Encoder.SAMPLES_PER_FRAME,
+        )
+        out += _OPUS_LENGTH.pack(len(packet))
+        out += packet
+    return bytes(out)
+
+
+def _new_opus_encoder() -> discord.opus.Encoder:
+    """音声向けに設定した Opus エンコーダーを生成する。
+
+    Returns:
+        64 kbps・音声モードの :class:`discord.opus.Encoder`。
+
+    Raises:
+        discord.opus.OpusNotLoaded: libopus を読み込めない場合。
+    """
+
+    encoder = discord.opus.Encoder()
+    encoder.set_bitrate(64)
+    encoder.set_signal_type("voice")
+    return encoder
+
+
+def _decode_opus(payload: bytes) -> bytes:
+    """:func:`_encode_opus` で符号化したパケット列を PCM へ復号する。
+
+    Args:
+        payload: 長さ接頭辞付きで連結した Opus パケット列。
+
+    Returns:
+        48 kHz ステレオの 16bit PCM 音声データ。
+    """
+
+    decoder = discord.opus.Decoder()
+    out = bytearray()
+    offset = 0
+    while offset < len(payload):
+        (size,) = _OPUS_LENGTH.unpack_from(payload, offset)
+        offset += _OPUS_LENGTH.size
+        out += decoder.decode(payload[offset : offset + size])
+        offset += size
+    return bytes(out)
+
+
 class RedisAudioStream:
     """Redis Streams を利用した音声チャンク管理クラス。"""
 
-    def __init__(self, redis_client: redis.Redis[bytes], stream_name: str) -> None:
+    USER_KEY = b"user_id"
+    PCM_KEY = b"pcm"
+    CODEC_KEY = b"codec"
+
+    def __init__(
+        self,
+        redis_client: redis.Redis[bytes],
+        stream_name: str,
+        batch_size: int = 64,
+        queue_size: int = 10_000,
+        maxlen: int = 10_000,
+        groups: tuple[str, ...] = (),
+    ) -> None:
         """インスタンスを生成する。
 
         Args:
             redis_client: Redis 接続オブジェクト。
             stream_name: 使用するストリーム名。
+            batch_size: 1 回のパイプラインでまとめて送信する最大チャンク数。
+            queue_size: 送信待ちとして保持できる最大チャンク数。
+            maxlen: ストリームに保持するおおよその最大エントリ数。
+            groups: :meth:`declare` でストリームとともに作成するコンシューマーグループ名。
         """
 
         self.redis: redis.Redis[bytes] = redis_client
         self.stream_name = stream_name
+        self.batch_size = batch_size
+        self.maxlen = maxlen
+        self.groups = groups
+        self._queue: asyncio.Queue[tuple[int, bytes | memoryview, bytes]] = (
+            asyncio.Queue(maxsize=queue_size)
+        )
+        self._writer_task: Optional[asyncio.Task[None]] = None
+        self._uid_cache: Dict[int, bytes] = {}
+
+    async def declare(self) -> None:
+        """ストリームとコンシューマーグループが存在しなければ作成する。
+
+        書き込みは ``NOMKSTREAM`` を指定して行うため、起動時と、ストリームが
+        消えたことを検知した時に呼び出す。グループはキーとともに消えるため
+        ``groups`` の各グループも ``0`` から読む状態で作り直し、再送したチャンクが
+        ``>`` で読み飛ばされないようにする。グループを指定しない場合の作成用
+        エントリは同じトランザクション内で削除するので読み手には見えない。
+        """
+
+        if self.groups:
+            for group in self.groups:
+                await self.create_group(group)
+            return
+        if await self.redis.exists(self.stream_name):
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xadd(self.stream_name, {b"init": b"1"})
+            pipe.xtrim(self.stream_name, maxlen=0)
+            await pipe.execute()
+
+    async def write(
+        self, user_id: int, pcm: PCMBuffer, codec: bytes = CODEC_PCM
+    ) -> None:
+        """音声チャンクを送信キューへ積む。
+
+        実際の書き込みはバックグラウンドの書き込みタスクがパイプラインで
+        まとめて行うため、本メソッドは Redis の応答を待たずに戻る。キューが
+        満杯の場合は受信処理を止めないようチャンクを破棄する。``bytes`` 以外の
+        バッファはコピーせずに参照を保持するので、呼び出し側は渡した後に
+        変更しないこと。
+
+        Args:
+            user_id: 発話者のユーザー ID。
+            pcm: ``codec`` で符号化された音声データ（PCM は 16 kHz モノラル）。
+            codec: 音声データのコーデック名。
+        """
+
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+        view = pcm if isinstance(pcm, bytes) else memoryview(pcm).cast("B")
+        try:
+            self._queue.put_nowait((user_id, view, codec))
+        except asyncio.QueueFull:
+            logger.warning("送信キューが満杯のため %s の音声を破棄しました", user_id)
+
+    async def flush(self) -> None:
+        """送信キューに積まれた音声チャンクがすべて書き込まれるまで待つ。"""
+
+        await self._queue.join()
 
-    async def write(self, user_id: int, pcm: bytes) -> None:
-        """音声チャンクを Redis Streams へ書き込む。
+    def _encode_user_id(self, user_id: int) -> bytes:
+        """ユーザー ID をストリームに書き込むバイト列へ変換する。
+
+        参加者は限られるため、変換結果をキャッシュして使い回す。
 
         Args:
             user_id: 発話者のユーザー ID。
-            pcm: 16bit PCM 音声データ。
+
+        Returns:
+            10 進表記の ASCII バイト列。
         """
 
-        fields: Dict[str, bytes] = {
-            "user_id": str(user_id).encode(),
-            "pcm": pcm,
-        }
-        await self.redis.xadd(self.stream_name, fields)
+        encoded = self._uid_cache.get(user_id)
+        if encoded is None:
+            encoded = self._uid_cache[user_id] = str(user_id).encode()
+        return encoded
 
-    async def read(self, last_id: str = "0-0") -> tuple[str, Optional[Dict[str, Any]]]:
-        """Redis Streams からデータを取得する。
+    async def _writer(self) -> None:
+        """送信キューから取り出したチャンクをパイプラインでまとめて書き込む。
+
+        ``NOMKSTREAM`` の XADD はストリームが消えていると例外ではなく nil を返すため、
+        その場合はストリームを再作成して書き込めなかったチャンクを再送する。
+        """
+
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                results = await self._xadd_batch(batch)
+                missing = [item for item, res in zip(batch, results) if res is None]
+                if missing:
+                    logger.warning(
+                        "ストリーム %s が存在しないため再作成して %d 件を再送します",
+                        self.stream_name,
+                        len(missing),
+                    )
+                    await self.declare()
+                    results = await self._xadd_batch(missing)
+                    lost = sum(res is None for res in results)
+                    if lost:
+                        logger.error("%d 件の音声チャンクを書き込めませんでした", lost)
+            except RedisError:
+                logger.exception("%d 件の音声チャンクを書き込めませんでした", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _xadd_batch(
+        self, batch: list[tuple[int, bytes | memoryview, bytes]]
+    ) -> list[Optional[bytes]]:
+        """チャンクの一覧を 1 回のパイプラインで XADD する。
 
         Args:
-            last_id: 最後に読み取ったメッセージ ID。
+            batch: ``(ユーザー ID, 音声データ, コーデック名)`` の一覧。
 
         Returns:
-            次のメッセージ ID とその内容。新しいメッセージがない場合は ``None`` を返す。
+            各チャンクのメッセージ ID。ストリームが存在せず書き込めなかった場合は ``None``。
+        """
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id, pcm, codec in batch:
+                fields: Dict[bytes, bytes | memoryview] = {
+                    self.USER_KEY: self._encode_user_id(user_id),
+                    self.PCM_KEY: pcm,
+                    self.CODEC_KEY: codec,
+                }
+                pipe.xadd(
+                    self.stream_name,
+                    fields,
+                    maxlen=self.maxlen,
+                    approximate=True,
+                    nomkstream=True,
+                )
+            return await pipe.execute()
+
+    async def create_group(self, group: str) -> None:
+        """コンシューマーグループを作成する。既に存在する場合は何もしない。
+
+        Args:
+            group: コンシューマーグループ名。
         """
 
-        response = await self.redis.xread(
-            {self.stream_name: last_id}, block=1000, count=1
+        try:
+            await self.redis.xgroup_create(self.stream_name, group, id="0", mkstream=True)
+        except ResponseError as exc:
+            if not str(exc).startswith("BUSYGROUP"):
+                raise
+
+    async def read_group_batch(
+        self, group: str, consumer: str, count: int = 64, block_ms: int = 1000
+    ) -> list[tuple[bytes, tuple[bytes, int, bytes]]]:
+        """コンシューマーグループとして未配送のメッセージをまとめて取得する。
+
+        Args:
+            group: コンシューマーグループ名。
+            consumer: グループ内で自身を識別するコンシューマー名。
+            count: 一度に取得する最大メッセージ数。
+            block_ms: 新しいメッセージを待機する最大時間（ミリ秒）。
+
+        Returns:
+            メッセージ ID と ``(音声データ, ユーザー ID, コーデック名)`` の組のリスト。
+            新しいメッセージがない場合は空リスト。
+        """
+
+        response = await self.redis.xreadgroup(
+            group, consumer, {self.stream_name: ">"}, count=count, block=block_ms
         )
         if not response:
-            return last_id, None
-        _, messages = response[0]
-        message_id, fields = messages[0]
-        data = {k.decode(): v for k, v in fields.items()}
-        return message_id, data
+            return []
+        if isinstance(response, dict):
+            # RESP3 では {ストリーム名: [メッセージ一覧]} の形式で返る
+            (messages,) = next(iter(response.values()))
+        else:
+            _, messages = response[0]
+        return await self._parse_messages(group, messages)
+
+    async def autoclaim(
+        self, group: str, consumer: str, min_idle_ms: int, count: int = 64
+    ) -> list[tuple[bytes, tuple[bytes, int, bytes]]]:
+        """停止したコンシューマーが処理しきれなかったメッセージを引き取る。
+
+        Args:
+            group: コンシューマーグループ名。
+            consumer: メッセージを引き取るコンシューマー名。
+            min_idle_ms: 引き取り対象とする未 ACK 期間の下限（ミリ秒）。
+            count: 一度に引き取る最大メッセージ数。
+
+        Returns:
+            :meth:`read_group_batch` と同じ形式のメッセージ一覧。
+        """
+
+        response = await self.redis.xautoclaim(
+            self.stream_name, group, consumer, min_idle_ms, count=count
+        )
+        # 削除済みのエントリは Redis のバージョンにより None として返る
+        messages = [(mid, fields) for mid, fields in response[1] if fields]
+        return await self._parse_messages(group, messages)
+
+    async def trim(self, retention_ms: int) -> None:
+        """保持期間を過ぎたエントリをストリームから削除する。
+
+        エントリ ID は Redis サーバーの時刻で採番されるため、基準時刻も
+        ワーカーではなくサーバーから取得する。
+
+        Args:
+            retention_ms: エントリを保持する期間（ミリ秒）。
+        """
+
+        seconds, microseconds = await self.redis.time()
+        min_id = seconds * 1000 + microseconds // 1000 - retention_ms
+        await self.redis.xtrim(self.stream_name, minid=min_id, approximate=True)
+
+    async def ack(self, group: str, *message_ids: bytes) -> None:
+        """処理を終えたメッセージを ACK する。
+
+        Args:
+            group: コンシューマーグループ名。
+            *message_ids: ACK するメッセージ ID。
+        """
+
+        await self.redis.xack(self.stream_name, group, *message_ids)
+
+    async def _parse_messages(
+        self, group: str, messages: list[tuple[bytes, Dict[bytes, bytes]]]
+    ) -> list[tuple[bytes, tuple[bytes, int, bytes]]]:
+        """ストリームのエントリを ``(音声データ, ユーザー ID, コーデック名)`` へ変換する。
+
+        必須フィールドが欠けたエントリは処理できないため、警告を出して ACK し、
+        結果から除外する。
+
+        Args:
+            group: エントリを読み取ったコンシューマーグループ名。
+            messages: Redis から返されたメッセージ ID とフィールドの組のリスト。
+
+        Returns:
+            メッセージ ID と ``(音声データ, ユーザー ID, コーデック名)`` の組のリスト。
+        """
+
+        pcm_key, user_key, codec_key = self.PCM_KEY, self.USER_KEY, self.CODEC_KEY
+        parsed: list[tuple[bytes, tuple[bytes, int, bytes]]] = []
+        malformed: list[bytes] = []
+        for message_id, fields in messages:
+            try:
+                entry = (
+                    fields[pcm_key],
+                    int(fields[user_key]),
+                    fields.get(codec_key, CODEC_PCM),
+                )
+            except (KeyError, ValueError):
+                malformed.append(message_id)
+                continue
+            parsed.append((message_id, entry))
+        if malformed:
+            logger.warning("不正な形式のエントリ %d 件を読み飛ばします", len(malformed))
+            await self.ack(group, *malformed)
+        return parsed
 
 
 class PCMStreamSink(RawDataSink):
-    """受信音声をリアルタイムで Redis に転送する Sink。"""
+    """受信音声をリアルタイムで Redis に転送する Sink。
+
+    20 ms 単位で届くフレームをユーザーごとに蓄積し、一定量または一定時間ごとに
+    指定コーデックで符号化した 1 つのチャンクとして書き込む。時間によるフラッシュは
+    タイマーで行うため、発話が途切れてフレームが届かなくなっても末尾が滞留しない。
+    """
 
-    def __init__(self, stream: RedisAudioStream) -> None:
+    def __init__(
+        self,
+        stream: RedisAudioStream,
+        flush_bytes: int = 38_400,
+        flush_interval: float = 0.5,
+        codec: bytes = CODEC_PCM,
+    ) -> None:
         """インスタンスを生成する。
 
         Args:
             stream: 書き込み対象の :class:`RedisAudioStream` インスタンス。
+            flush_bytes: 書き込みを行うバッファサイズ（既定値は 48 kHz ステレオで 200 ms 分）。
+            flush_interval: 最初のフレームを受信してからバッファを保持する最大時間（秒）。
+            codec: ストリームへ書き込む際のコーデック名。
         """
 
         super().__init__()
         self.stream = stream
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.codec = codec
+        self._bufs: dict[int, bytearray] = {}
+        self._timers: dict[int, asyncio.TimerHandle] = {}
+        self._flush_tasks: set[asyncio.Task[None]] = set()
 
     async def write(self, data, user: discord.User) -> None:  # type: ignore[override]
         """Discord からの音声フレームを受信する度に呼び出される。
@@ -119,59 +484,306 @@ class PCMStreamSink(RawDataSink):
             user: 音声の送信者。
         """
 
-        await self.stream.write(user.id, data.pcm)  # type: ignore[attr-defined]
+        buf = self._bufs.get(user.id)
+        if buf is None:
+            buf = self._bufs[user.id] = bytearray()
+            self._timers[user.id] = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._on_flush_timer, user.id
+            )
+        buf.extend(data.pcm)  # type: ignore[attr-defined]
+        if len(buf) >= self.flush_bytes:
+            await self._flush_user(user.id)
+
+    async def flush(self) -> None:
+        """全ユーザーの蓄積済み音声を書き込む。"""
+
+        for user_id in list(self._bufs):
+            await self._flush_user(user_id)
+
+    def _on_flush_timer(self, user_id: int) -> None:
+        """保持時間を過ぎたユーザーのバッファをフラッシュするタスクを起動する。
+
+        Args:
+            user_id: 対象ユーザーの ID。
+        """
+
+        task = asyncio.create_task(self._flush_user(user_id))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_user(self, user_id: int) -> None:
+        """指定ユーザーの蓄積済み音声を 1 チャンクとして書き込む。
+
+        Args:
+            user_id: 対象ユーザーの ID。
+        """
+
+        timer = self._timers.pop(user_id, None)
+        if timer is not None:
+            timer.cancel()
+        buf = self._bufs.pop(user_id, None)
+        if not buf:
+            return
+        if self.codec == CODEC_OPUS:
+            # エントリはコンシューマーグループで別プロセスに配られ、復号側で状態を
+            # 引き継げないため、チャンクごとに新しいエンコーダーで単独に復号可能にする
+            payload = _encode_opus(_new_opus_encoder(), buf)
+            await self.stream.write(user_id, payload, CODEC_OPUS)
+            return
+        if self.codec == CODEC_MULAW:
+            await self.stream.write(user_id, mulaw_resample_mono(buf), CODEC_MULAW)
+        else:
+            await self.stream.write(user_id, memoryview(downsample_to_16k_mono(buf)))
+
+
+KOTOBA_REPO_ID = "kotoba-tech/kotoba-whisper-v2.0-faster"
+"""文字起こしに使用する Kotoba-Whisper のリポジトリ ID。"""
+
+_model: Any = None
+
+
+def _load_model(model_dir: str, allow_dummy: bool = False) -> None:
+    """プロセスプールの各ワーカーで STT モデルを一度だけ読み込む。
+
+    Args:
+        model_dir: ``scripts/download_models.py`` の保存先ディレクトリ。
+        allow_dummy: ``True`` の場合は読み込みに失敗してもダミーの結果で動作を続ける。
+
+    Raises:
+        Exception: ``allow_dummy`` が ``False`` でモデルを読み込めない場合。
+    """
+
+    global _model
+    try:
+        from faster_whisper import WhisperModel
+
+        _model = WhisperModel(
+            KOTOBA_REPO_ID,
+            device="auto",
+            compute_type="int8",
+            download_root=model_dir,
+            local_files_only=True,
+        )
+    except Exception:  # pragma: no cover - 環境依存のためテスト除外
+        if not allow_dummy:
+            raise
+        logger.exception("STT モデルを読み込めないためダミーの結果を返します")
+        _model = None
+
+
+def _model_ready() -> bool:
+    """ワーカープロセスで STT モデルが読み込まれているかを返す。
+
+    Returns:
+        モデルを読み込めていれば ``True``、ダミーで動作している場合は ``False``。
+    """
+
+    return _model is not None
+
+
+def _infer(payload: bytes, codec: bytes = CODEC_PCM) -> str:
+    """ワーカープロセス内で音声データを復号して文字起こしする。
+
+    ダミー動作を許可してモデルを読み込めなかった場合は、データ長を利用した
+    ダミーの結果を返す。
+
+    Args:
+        payload: ``codec`` で符号化された音声データ。
+        codec: 音声データのコーデック名。
+
+    Returns:
+        文字起こし結果の文字列。
+    """
+
+    if codec == CODEC_OPUS:
+        samples = downsample_to_16k_mono(_decode_opus(payload))
+    elif codec == CODEC_MULAW:
+        samples = decode_mulaw(payload)
+    else:
+        samples = np.frombuffer(payload, dtype="<i2")
+    if _model is None:
+        return f"{samples.nbytes}バイトの音声"
+    audio = samples.astype(np.float32) / 32768.0
+    segments, _ = _model.transcribe(audio, language="ja")
+    return "".join(segment.text for segment in segments)
 
 
 class STTWorker:
-    """Redis Streams を監視して音声を文字起こしするワーカー。"""
+    """Redis Streams を監視して音声を文字起こしするワーカー。
+
+    コンシューマーグループで読み取るため、複数のワーカーを起動すると
+    チャンクが負荷分散される。
+    """
 
-    def __init__(self, stream: RedisAudioStream) -> None:
+    def __init__(
+        self,
+        stream: RedisAudioStream,
+        model_dir: str,
+        max_workers: int = 1,
+        group: str = STT_GROUP,
+        consumer: Optional[str] = None,
+        claim_interval: float = 30.0,
+        claim_idle_ms: int = 60_000,
+        retention_ms: int = 300_000,
+        trim_every: int = 256,
+        allow_dummy: bool = False,
+    ) -> None:
         """インスタンスを生成する。
 
+        推論は GIL の影響を受けないようプロセスプールで実行し、各プロセスは
+        起動時にモデルを読み込む。
+
         Args:
             stream: 音声チャンクを読み出す :class:`RedisAudioStream`。
+            model_dir: STT モデルを保存したディレクトリ。
+            max_workers: 推論を行うプロセス数。
+            group: 参加するコンシューマーグループ名。
+            consumer: コンシューマー名。省略時は ``ホスト名-PID`` を使用する。
+            claim_interval: 停止したワーカーの未 ACK メッセージを確認する間隔（秒）。
+            claim_idle_ms: 引き取り対象とする未 ACK 期間の下限（ミリ秒）。
+            retention_ms: ストリームにエントリを保持する期間（ミリ秒）。
+                未 ACK のエントリを引き取る前に削除しないよう ``claim_idle_ms``
+                より十分長くする。
+            trim_every: ストリームを切り詰める間隔（処理メッセージ数）。
+            allow_dummy: モデルを読み込めない場合にダミーの結果で動作を続けるか。
         """
 
         self.stream = stream
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_interval = claim_interval
+        self.claim_idle_ms = claim_idle_ms
+        self.retention_ms = retention_ms
+        self.trim_every = trim_every
+        self._model_dir = model_dir
+        self._max_workers = max_workers
+        self._allow_dummy = allow_dummy
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        """モデルを読み込む推論用のプロセスプールを生成する。
+
+        Returns:
+            各プロセスの起動時に :func:`_load_model` を実行するプロセスプール。
+        """
 
-    async def transcribe(self, pcm: bytes) -> str:
-        """PCM データを文字列へ変換する。
+        return ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_model,
+            initargs=(self._model_dir, self._allow_dummy),
+        )
 
-        実際には Faster-Whisper などによる推論を行うが、ここではデータ長を
-        利用したダミーの結果を返す。
+    async def transcribe(self, payload: bytes, codec: bytes = CODEC_PCM) -> str:
+        """音声データを文字列へ変換する。
 
         Args:
-            pcm: 16bit PCM 音声データ。
+            payload: ``codec`` で符号化された音声データ。
+            codec: 音声データのコーデック名。
 
         Returns:
             文字起こし結果の文字列。
         """
 
-        return f"{len(pcm)}バイトの音声"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _infer, payload, codec)
 
     async def run(self) -> None:
-        """無限ループでストリームを読み取り、逐次文字起こしを行う。"""
+        """無限ループでストリームを読み取り、逐次文字起こしを行う。
+
+        文字起こしを終えたメッセージは ACK し、一定間隔で停止したワーカーの
+        未 ACK メッセージを引き取る。また一定件数ごとに保持期間を過ぎた
+        エントリを削除する。文字起こしに失敗したメッセージもログに記録して
+        ACK し、同じエントリで全ワーカーが停止し続けないようにする。
+        ストリームとともにグループが消えた場合は作り直して読み取りを続ける。
+        """
 
-        last_id = "0-0"
+        await self._check_model()
+        await self.stream.create_group(self.group)
+        next_claim = time.monotonic() + self.claim_interval
+        since_trim = 0
         while True:
-            last_id, data = await self.stream.read(last_id)
-            if data is None:
-                await asyncio.sleep(0.1)
+            try:
+                messages = await self.stream.read_group_batch(
+                    self.group, self.consumer
+                )
+                if time.monotonic() >= next_claim:
+                    messages += await self.stream.autoclaim(
+                        self.group, self.consumer, self.claim_idle_ms
+                    )
+                    next_claim = time.monotonic() + self.claim_interval
+            except ResponseError as exc:
+                if not str(exc).startswith("NOGROUP"):
+                    raise
+                logger.warning(
+                    "コンシューマーグループ %s が存在しないため再作成します", self.group
+                )
+                await self.stream.create_group(self.group)
                 continue
-            pcm: bytes = data["pcm"]
-            user_id = data["user_id"]
-            text = await self.transcribe(pcm)
-            print(f"{user_id}: {text}")
+            if not messages:
+                continue
+            results = await asyncio.gather(
+                *(self.transcribe(pcm, codec) for _, (pcm, _, codec) in messages),
+                return_exceptions=True,
+            )
+            pool_broken = False
+            for (message_id, (_, user_id, _)), result in zip(messages, results):
+                if isinstance(result, Exception):
+                    logger.error(
+                        "%s (%s) の文字起こしに失敗しました",
+                        message_id,
+                        user_id,
+                        exc_info=result,
+                    )
+                    pool_broken |= isinstance(result, BrokenProcessPool)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    logger.info("%s: %s", user_id, result)
+            if pool_broken:
+                logger.warning("推論用のプロセスプールを再起動します")
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._new_pool()
+            await self.stream.ack(self.group, *(mid for mid, _ in messages))
+            since_trim += len(messages)
+            if since_trim >= self.trim_every:
+                await self.stream.trim(self.retention_ms)
+                since_trim = 0
+
+    async def _check_model(self) -> None:
+        """推論プロセスを起動し、モデルを読み込めたかを確認する。
+
+        Raises:
+            RuntimeError: ダミー動作を許可せずにモデルを読み込めなかった場合。
+        """
+
+        loop = asyncio.get_running_loop()
+        try:
+            ready = await loop.run_in_executor(self._pool, _model_ready)
+        except BrokenProcessPool as exc:
+            raise RuntimeError(
+                "STT モデルを読み込めません。MODEL_DIR と scripts/download_models.py の実行結果を確認してください。"
+            ) from exc
+        if not ready:
+            logger.warning("STT モデルが読み込まれていないためダミーの結果で動作します")
+
+    def close(self) -> None:
+        """推論用のプロセスプールを停止する。"""
+
+        self._pool.shutdown(cancel_futures=True)
 
 
 class VoiceBot(commands.Bot):
     """Discord 上で音声を収集するボットクラス。"""
 
-    def __init__(self, audio_stream: RedisAudioStream) -> None:
+    def __init__(
+        self, audio_stream: RedisAudioStream, codec: bytes = CODEC_PCM
+    ) -> None:
         """インスタンスを生成する。
 
         Args:
             audio_stream: 音声チャンクを書き込む :class:`RedisAudioStream`。
+            codec: 受信音声をストリームへ書き込む際のコーデック名。
         """
 
         intents = discord.Intents.default()
@@ -179,11 +791,12 @@ class VoiceBot(commands.Bot):
         intents.voice_states = True
         super().__init__(command_prefix="/", intents=intents)
         self.audio_stream = audio_stream
+        self.codec = codec
 
     async def on_ready(self) -> None:  # type: ignore[override]
         """ログイン完了時に呼び出される。"""
 
-        print("Bot にログインしました")
+        logger.info("Bot にログインしました")
 
     async def join_and_record(self, channel: discord.VoiceChannel) -> None:
         """指定ボイスチャンネルへ参加し録音を開始する。
@@ -195,7 +808,7 @@ class VoiceBot(commands.Bot):
         voice = await channel.connect()
         if not hasattr(voice, "start_recording"):
             raise RuntimeError("この環境の discord.py では録音機能が提供されていません")
-        sink = PCMStreamSink(self.audio_stream)
+        sink = PCMStreamSink(self.audio_stream, codec=self.codec)
         voice.start_recording(sink, self._after_recording)  # type: ignore[attr-defined]
 
     async def _after_recording(self, sink: PCMStreamSink) -> None:
@@ -205,28 +818,67 @@ class VoiceBot(commands.Bot):
             sink: 使用していた :class:`PCMStreamSink`。
         """
 
+        await sink.flush()
         for user, audio in sink.audio_data.items():
-            pcm = b"".join(chunk.pcm for chunk in audio)
-            await self.audio_stream.write(user.id, pcm)
+            pcm = bytearray(sum(len(chunk.pcm) for chunk in audio))
+            offset = 0
+            for chunk in audio:
+                size = len(chunk.pcm)
+                pcm[offset : offset + size] = chunk.pcm
+                offset += size
+            samples = downsample_to_16k_mono(pcm)
+            await self.audio_stream.write(user.id, memoryview(samples))
+        await self.audio_stream.flush()
 
 
-async def main() -> None:
-    """Discord ボットと STT ワーカーを起動する。
+def setup_logging(level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """ログの整形と出力をバックグラウンドスレッドで行うよう設定する。
 
-    `.env` から環境変数を読み込み、Redis への接続確認後にボットと
-    ワーカーを起動する。
+    イベントループ上ではキューへ積むだけになるため、標準出力への書き込みで
+    他のコルーチンが待たされない。
 
-    Raises:
-        RuntimeError: ``BOT_TOKEN`` または Redis 接続に問題がある場合。
+    Args:
+        level: ルートロガーに設定するログレベル。
+
+    Returns:
+        開始済みの :class:`logging.handlers.QueueListener`。終了時に ``stop()`` を呼ぶ。
     """
 
-    load_dotenv()
-    token = os.getenv("DISCORD_BOT_TOKEN")
-    if token is None:
-        raise RuntimeError("DISCORD_BOT_TOKEN が設定されていません")
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+
+async def connect_redis() -> redis.Redis[bytes]:
+    """``REDIS_URL`` の Redis へ接続し、疎通を確認したクライアントを返す。
+
+    Returns:
+        ボットと STT ワーカーで共有する Redis クライアント。
+
+    Raises:
+        RuntimeError: Redis 接続に問題がある場合。
+    """
 
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    redis_client: redis.Redis[bytes] = redis.from_url(redis_url, decode_responses=False)
+    if not HIREDIS_AVAILABLE:
+        logger.warning("hiredis が見つからないため Python 実装のパーサーを使用します")
+    # TCP_NODELAY は redis-py が接続時に常に設定する
+    pool = redis.BlockingConnectionPool.from_url(
+        redis_url,
+        max_connections=32,
+        socket_keepalive=True,
+        decode_responses=False,
+        protocol=3,
+    )
+    redis_client: redis.Redis[bytes] = redis.Redis(connection_pool=pool)
 
     try:
         await redis_client.ping()
@@ -234,14 +886,47 @@ async def main() -> None:
         raise RuntimeError(
             "Redis サーバーに接続できません。REDIS_URL とサーバーの起動状態を確認してください。"
         ) from exc
+    return redis_client
+
+
+async def main() -> None:
+    """Discord ボットを起動する。
 
-    audio_stream = RedisAudioStream(redis_client, "audio")
-    bot = VoiceBot(audio_stream)
+    `.env` から環境変数を読み込み、Redis への接続確認後にボットを起動する。
+    STT ワーカーは推論で GIL を奪わないよう ``scripts/run_stt_worker.py`` で
+    別プロセスとして起動する。
 
-    worker = STTWorker(audio_stream)
-    asyncio.create_task(worker.run())
+    Raises:
+        RuntimeError: ``BOT_TOKEN``・``AUDIO_CODEC`` または Redis 接続に問題がある場合。
+    """
+
+    load_dotenv()
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    if token is None:
+        raise RuntimeError("DISCORD_BOT_TOKEN が設定されていません")
 
-    await bot.start(token)
+    listener = setup_logging()
+    try:
+        redis_client = await connect_redis()
+        batch_size = int(os.getenv("REDIS_BATCH_SIZE", "64"))
+        audio_stream = RedisAudioStream(
+            redis_client, AUDIO_STREAM, batch_size=batch_size, groups=(STT_GROUP,)
+        )
+        await audio_stream.declare()
+        codec = os.getenv("AUDIO_CODEC", "opus").encode()
+        if codec not in (CODEC_PCM, CODEC_OPUS, CODEC_MULAW):
+            raise RuntimeError(f"未対応の AUDIO_CODEC です: {codec.decode()}")
+        if codec == CODEC_OPUS:
+            try:
+                _new_opus_encoder()
+            except discord.opus.OpusNotLoaded:
+                logger.warning("libopus を読み込めないため PCM のまま書き込みます")
+                codec = CODEC_PCM
+        bot = VoiceBot(audio_stream, codec=codec)
+
+        await bot.start(token)
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":